@@ -88,22 +88,3 @@ impl Display for Bootloader {
         }
     }
 }
-
-#[derive(ValueEnum, Default, Clone, Copy)]
-pub enum Firmware {
-    /// Specifies the Bios firmware.
-    #[default]
-    Bios,
-
-    /// Specifies the Uefi Firmware.
-    Uefi,
-}
-
-impl Display for Firmware {
-    fn fmt(&self, f: &mut Formatter<'_>) -> fmt::Result {
-        match self {
-            Firmware::Bios => f.write_str("Bios"),
-            Firmware::Uefi => f.write_str("Uefi"),
-        }
-    }
-}
@@ -9,6 +9,7 @@ use crate::arguments::{Bootloader, Target};
 use clap::Args;
 use color_eyre::eyre::anyhow;
 use color_eyre::Result;
+use std::{panic, thread};
 use xshell::{cmd, Shell};
 
 /// Builds the microdragon kernel.
@@ -28,7 +29,7 @@ pub struct BuildArguments {
 }
 
 impl BuildArguments {
-    pub fn run(&self) -> Result<()> {
+    pub fn validate(&self) -> Result<()> {
         if !self.bootloader.supports_target(self.target) {
             return Err(anyhow!(
                 "The selected bootloader ({}) does not support the selected target ({})",
@@ -37,6 +38,12 @@ impl BuildArguments {
             ));
         }
 
+        Ok(())
+    }
+
+    pub fn run(&self) -> Result<()> {
+        self.validate()?;
+
         let sh = Shell::new()?;
 
         install_target_if_needed(&sh, self.target)?;
@@ -57,14 +64,31 @@ impl BuildArguments {
 
         Ok(())
     }
+
+    /// Runs the build on a separate thread while `task` runs on the current one.
+    ///
+    /// The arguments are validated before either starts. The build is waited for before
+    /// returning and its error takes precedence over the task's.
+    pub fn run_alongside<T>(&self, task: impl FnOnce() -> Result<T>) -> Result<T> {
+        self.validate()?;
+
+        thread::scope(|s| {
+            let build = s.spawn(|| self.run());
+            let result = task();
+
+            build
+                .join()
+                .unwrap_or_else(|panic| panic::resume_unwind(panic))?;
+            result
+        })
+    }
 }
 
 fn install_target_if_needed(sh: &Shell, target: Target) -> Result<()> {
     let installed = cmd!(sh, "rustup target list --installed").read()?;
-    let targets: Vec<&str> = installed.lines().collect();
     let target = target.as_rust_target();
 
-    if !targets.contains(&target) {
+    if !installed.lines().any(|line| line == target) {
         println!("Rust target {} not installed. Installing...", target);
         cmd!(sh, "rustup target add {target}").run()?;
     }
@@ -5,10 +5,12 @@ use super::Dependency;
 use color_eyre::eyre::{anyhow, Result};
 use serde_json::Value;
 use std::fs::File;
-use std::io;
+use std::io::{self, BufWriter, Write};
 use std::path::Path;
 use xshell::Shell;
 
+const DOWNLOAD_BUFFER_SIZE: usize = 1024 * 1024;
+
 pub struct DownloadDependency {
     pub id: &'static str,
     pub url: &'static str,
@@ -24,8 +26,9 @@ impl Dependency for DownloadDependency {
     fn install(&self, sh: &Shell, metadata: &mut Value) -> Result<()> {
         let mut reader = ureq::get(self.url).call()?.into_reader();
         let path = sh.current_dir().join(self.file_name);
-        let mut file = File::create(&path)?;
+        let mut file = BufWriter::with_capacity(DOWNLOAD_BUFFER_SIZE, File::create(&path)?);
         io::copy(&mut reader, &mut file)?;
+        file.flush()?;
 
         if let Some(post_install) = self.post_install {
             post_install(&path, sh)?;
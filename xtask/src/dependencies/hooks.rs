@@ -11,9 +11,7 @@ pub fn build_limine(sh: &Shell) -> Result<()> {
         return Ok(());
     }
 
-    if sh.path_exists("limine") {
-        sh.remove_path("limine")?;
-    }
+    sh.remove_path("limine")?;
 
     cmd!(sh, "make").run()?;
 
@@ -26,9 +24,7 @@ pub fn extract_omvf(tar: &Path, sh: &Shell) -> Result<()> {
     sh.remove_path(tar)?;
 
     let ovmf = sh.current_dir().join("OVMF");
-    if ovmf.exists() {
-        fs::remove_dir_all(&ovmf)?;
-    }
+    sh.remove_path(&ovmf)?;
     fs::rename(sh.current_dir().join("edk2-stable202211-r1-bin"), ovmf)?;
 
     Ok(())
@@ -5,7 +5,6 @@ use crate::dependencies::Dependency;
 use color_eyre::eyre::anyhow;
 use color_eyre::Result;
 use serde_json::Value;
-use std::fs;
 use xshell::{cmd, Shell};
 
 pub struct RustBootloaderDependency {
@@ -19,9 +18,7 @@ impl Dependency for RustBootloaderDependency {
 
     fn install(&self, sh: &Shell, metadata: &mut Value) -> Result<()> {
         let target = sh.current_dir().join(self.id());
-        if target.exists() {
-            fs::remove_dir_all(&target)?;
-        }
+        sh.remove_path(&target)?;
 
         let version = self.version;
         cmd!(
@@ -5,10 +5,16 @@ use color_eyre::eyre::anyhow;
 use color_eyre::Result;
 use fatfs::{FormatVolumeOptions, FsOptions};
 use std::collections::BTreeMap;
-use std::fs::File;
-use std::io::Write;
+use std::fs::{File, Metadata};
+use std::io::{ErrorKind, Write};
+use std::ops::Bound;
 use std::path::{Path, PathBuf};
-use std::{fs, io};
+use std::time::SystemTime;
+use std::{fs, io, panic, thread};
+
+const WRITE_THREADS: usize = 4;
+
+pub type Manifest = BTreeMap<String, (u64, SystemTime)>;
 
 pub enum FileSystemEntry {
     Directory,
@@ -24,75 +30,31 @@ impl FileSystem {
     }
 
     pub fn create_directory(&mut self, path: &str) -> Result<()> {
-        for segment in PathIter::new(path) {
-            if segment.len() == path.len() {
-                self.0
-                    .insert(segment.to_string(), FileSystemEntry::Directory);
-                break;
-            } else {
-                let entry = self
-                    .0
-                    .entry(segment.to_string())
-                    .or_insert(FileSystemEntry::Directory);
-
-                if !matches!(entry, FileSystemEntry::Directory) {
-                    return Err(anyhow!("Path segment {} is not a directory", segment));
-                }
-            }
-        }
+        let path = self.create_parents(path)?;
+        self.0.insert(path.to_string(), FileSystemEntry::Directory);
 
         Ok(())
     }
 
     pub fn create_file(&mut self, path: &str, file: PathBuf) -> Result<()> {
-        for segment in PathIter::new(path) {
-            if segment.len() == path.len() {
-                let old = self
-                    .0
-                    .insert(segment.to_string(), FileSystemEntry::File(file));
-
-                if matches!(old, Some(FileSystemEntry::Directory)) {
-                    self.purge_children(segment);
-                }
-
-                break;
-            } else {
-                let entry = self
-                    .0
-                    .entry(segment.to_string())
-                    .or_insert(FileSystemEntry::Directory);
+        let path = self.create_parents(path)?;
+        let old = self.0.insert(path.to_string(), FileSystemEntry::File(file));
 
-                if !matches!(entry, FileSystemEntry::Directory) {
-                    return Err(anyhow!("Path segment {} is not a directory", segment));
-                }
-            }
+        if matches!(old, Some(FileSystemEntry::Directory)) {
+            self.purge_children(path);
         }
 
         Ok(())
     }
 
     pub fn create_buffer(&mut self, path: &str, buffer: Vec<u8>) -> Result<()> {
-        for segment in PathIter::new(path) {
-            if segment.len() == path.len() {
-                let old = self
-                    .0
-                    .insert(segment.to_string(), FileSystemEntry::Buffer(buffer));
-
-                if matches!(old, Some(FileSystemEntry::Directory)) {
-                    self.purge_children(segment);
-                }
-
-                break;
-            } else {
-                let entry = self
-                    .0
-                    .entry(segment.to_string())
-                    .or_insert(FileSystemEntry::Directory);
+        let path = self.create_parents(path)?;
+        let old = self
+            .0
+            .insert(path.to_string(), FileSystemEntry::Buffer(buffer));
 
-                if !matches!(entry, FileSystemEntry::Directory) {
-                    return Err(anyhow!("Path segment {} is not a directory", segment));
-                }
-            }
+        if matches!(old, Some(FileSystemEntry::Directory)) {
+            self.purge_children(path);
         }
 
         Ok(())
@@ -147,12 +109,22 @@ impl FileSystem {
     pub fn write_fat_image(&self, path: &Path, label: [u8; 11]) -> Result<()> {
         const MB: u64 = 1024 * 1024;
 
+        // Open every source file once up front, so its size comes from the open handle
+        // and the same handle is reused for copying instead of resolving the path twice.
+        let mut sources = Vec::new();
         let mut size = 0;
-        for entry in self.0.values() {
+        for (path, entry) in &self.0 {
             match entry {
                 FileSystemEntry::Directory => {}
-                FileSystemEntry::File(file) => size += fs::metadata(file)?.len(),
-                FileSystemEntry::Buffer(buffer) => size += buffer.len() as u64,
+                FileSystemEntry::File(file) => {
+                    let file = File::open(file)?;
+                    size += file.metadata()?.len();
+                    sources.push((path, Some(file)));
+                }
+                FileSystemEntry::Buffer(buffer) => {
+                    size += buffer.len() as u64;
+                    sources.push((path, None));
+                }
             }
         }
 
@@ -172,6 +144,9 @@ impl FileSystem {
         let fat = fatfs::FileSystem::new(file, FsOptions::new())?;
         let root = fat.root_dir();
 
+        // Parents sort before their children, so every entry can be created inside its
+        // already opened parent instead of resolving the whole path from the root again.
+        let mut dirs: BTreeMap<&str, _> = BTreeMap::new();
         for dir in self.0.iter().filter_map(|(k, v)| {
             if matches!(v, FileSystemEntry::Directory) {
                 Some(k)
@@ -179,22 +154,21 @@ impl FileSystem {
                 None
             }
         }) {
-            root.create_dir(dir)?;
+            let (parent, name) = split_parent(dir);
+            let created = dirs.get(parent).unwrap_or(&root).create_dir(name)?;
+            dirs.insert(dir.as_str(), created);
         }
 
-        for (path, entry) in self
-            .0
-            .iter()
-            .filter(|(_, v)| matches!(v, FileSystemEntry::File(_) | FileSystemEntry::Buffer(_)))
-        {
-            let mut file = root.create_file(path)?;
+        for (path, source) in sources {
+            let (parent, name) = split_parent(path);
+            let mut file = dirs.get(parent).unwrap_or(&root).create_file(name)?;
             file.truncate()?;
 
-            match entry {
-                FileSystemEntry::File(path) => {
-                    io::copy(&mut File::open(path)?, &mut file)?;
+            match (source, &self.0[path]) {
+                (Some(mut source), _) => {
+                    io::copy(&mut source, &mut file)?;
                 }
-                FileSystemEntry::Buffer(buffer) => {
+                (None, FileSystemEntry::Buffer(buffer)) => {
                     file.write_all(buffer)?;
                 }
                 _ => unreachable!(),
@@ -204,15 +178,100 @@ impl FileSystem {
         Ok(())
     }
 
+    /// Mirrors this file system into `path`, creating the directory if needed.
+    ///
+    /// Everything below `path` that is not part of this file system is deleted, so `path`
+    /// must be a directory owned by the caller. Files are only copied if their staged copy
+    /// is outdated.
     pub fn write_to_path(&self, path: &Path) -> Result<()> {
+        fs::create_dir_all(path)?;
+        self.remove_stale(path, "")?;
+
+        let mut files = Vec::new();
         for (sub, entry) in &self.0 {
             let target = path.join(sub);
             match entry {
-                FileSystemEntry::Directory => fs::create_dir(target)?,
-                FileSystemEntry::File(source) => {
-                    fs::copy(source, target)?;
+                FileSystemEntry::Directory => match fs::create_dir(target) {
+                    Err(err) if err.kind() != ErrorKind::AlreadyExists => return Err(err.into()),
+                    _ => {}
+                },
+                _ => files.push((target, entry)),
+            }
+        }
+
+        // All directories exist now, so the independent file copies can overlap.
+        let chunk_size = files.len().div_ceil(WRITE_THREADS).max(1);
+        thread::scope(|s| {
+            let workers: Vec<_> = files
+                .chunks(chunk_size)
+                .map(|chunk| {
+                    s.spawn(move || {
+                        chunk
+                            .iter()
+                            .try_for_each(|(target, entry)| write_entry(target, entry))
+                    })
+                })
+                .collect();
+
+            workers.into_iter().try_for_each(|worker| {
+                worker
+                    .join()
+                    .unwrap_or_else(|panic| panic::resume_unwind(panic))
+            })
+        })
+    }
+
+    /// Collects the size and modification time of every entry staged by `write_to_path`.
+    pub fn manifest(&self, path: &Path) -> Result<Manifest> {
+        self.0
+            .keys()
+            .map(|sub| -> Result<_> {
+                let meta = fs::metadata(path.join(sub))?;
+                Ok((sub.clone(), (meta.len(), meta.modified()?)))
+            })
+            .collect()
+    }
+
+    /// Creates the missing parent directories of `path` and returns it without a leading slash.
+    ///
+    /// Parents that already exist are looked up by `&str`, so recurring prefixes like `EFI/BOOT`
+    /// don't allocate. Once a parent is missing, none of its children can exist either.
+    fn create_parents<'a>(&mut self, path: &'a str) -> Result<&'a str> {
+        let path = path.strip_prefix('/').unwrap_or(path);
+        let Some((parents, _)) = path.rsplit_once('/') else {
+            return Ok(path);
+        };
+
+        let mut missing = false;
+        for segment in PathIter::new(parents) {
+            if !missing {
+                match self.0.get(segment) {
+                    Some(FileSystemEntry::Directory) => continue,
+                    Some(_) => return Err(anyhow!("Path segment {} is not a directory", segment)),
+                    None => missing = true,
+                }
+            }
+
+            self.0
+                .insert(segment.to_string(), FileSystemEntry::Directory);
+        }
+
+        Ok(path)
+    }
+
+    /// Removes everything below `dir` that is not part of this file system or changed its kind.
+    fn remove_stale(&self, dir: &Path, prefix: &str) -> Result<()> {
+        for entry in fs::read_dir(dir)? {
+            let entry = entry?;
+            let key = format!("{prefix}{}", entry.file_name().to_string_lossy());
+
+            match (self.0.get(&key), entry.file_type()?.is_dir()) {
+                (Some(FileSystemEntry::Directory), true) => {
+                    self.remove_stale(&entry.path(), &(key + "/"))?
                 }
-                FileSystemEntry::Buffer(buffer) => fs::write(target, buffer)?,
+                (Some(FileSystemEntry::File(_) | FileSystemEntry::Buffer(_)), false) => {}
+                (_, true) => fs::remove_dir_all(entry.path())?,
+                (_, false) => fs::remove_file(entry.path())?,
             }
         }
 
@@ -220,8 +279,62 @@ impl FileSystem {
     }
 
     fn purge_children(&mut self, path: &str) {
-        self.0.retain(|k, _| !k.starts_with(path))
+        let prefix = format!("{path}/");
+        let children: Vec<String> = self
+            .0
+            .range::<str, _>((Bound::Included(prefix.as_str()), Bound::Unbounded))
+            .map(|(k, _)| k)
+            .take_while(|k| k.starts_with(&prefix))
+            .cloned()
+            .collect();
+
+        for child in children {
+            self.0.remove(&child);
+        }
+    }
+}
+
+fn split_parent(path: &str) -> (&str, &str) {
+    path.rsplit_once('/').unwrap_or(("", path))
+}
+
+fn write_entry(target: &Path, entry: &FileSystemEntry) -> Result<()> {
+    match entry {
+        FileSystemEntry::Directory => unreachable!(),
+        FileSystemEntry::File(source) => {
+            let source_meta = fs::metadata(source)?;
+            if is_outdated(&source_meta, target)? {
+                fs::copy(source, target)?;
+                File::options()
+                    .write(true)
+                    .open(target)?
+                    .set_modified(source_meta.modified()?)?;
+            }
+        }
+        FileSystemEntry::Buffer(buffer) => {
+            // Only rewrite changed buffers, so their modification time stays stable.
+            if fs::read(target).ok().as_ref() != Some(buffer) {
+                fs::write(target, buffer)?;
+            }
+        }
     }
+
+    Ok(())
+}
+
+/// Checks if `target` is missing or differs from `source` in length or modification time.
+///
+/// Staged copies take over the modification time of their source, so any difference means
+/// the source changed, even if it is older than the staged copy, like when switching
+/// between release and debug kernels.
+fn is_outdated(source: &Metadata, target: &Path) -> Result<bool> {
+    let target = match fs::metadata(target) {
+        Ok(meta) => meta,
+        Err(err) if err.kind() == ErrorKind::NotFound => return Ok(true),
+        Err(err) => return Err(err.into()),
+    };
+
+    Ok(source.len() != target.len() || source.modified()? != target.modified()?)
 }
 
 struct PathIter<'a> {
@@ -24,6 +24,8 @@ pub const XORRISO_ARGUMENTS: &[&str] = &[
     "--protective-msdos-label",
 ];
 
+pub const BIOS_INSTALL_ARGUMENTS: &[&str] = &["bios-install"];
+
 pub fn copy_files(ctx: &mut CommandContext, target: Target) -> Result<()> {
     let dep = ctx.resolve_dependency(&LIMINE_DEPENDENCY)?;
     let cfg = ctx
@@ -59,7 +61,11 @@ pub fn post_process_iso(ctx: &mut CommandContext, iso: &Path) -> Result<()> {
         "limine"
     });
 
-    ctx.shell().cmd(limine).arg("bios-install").arg(iso).run()?;
+    ctx.shell()
+        .cmd(limine)
+        .args(BIOS_INSTALL_ARGUMENTS)
+        .arg(iso)
+        .run()?;
 
     Ok(())
 }
@@ -5,10 +5,15 @@ mod limine;
 
 use crate::arguments::Bootloader;
 use crate::build::{self, BuildArguments};
+use crate::fs::Manifest;
 use crate::utils::CommandContext;
 use clap::Args;
 use color_eyre::eyre::anyhow;
 use color_eyre::Result;
+use serde::{Deserialize, Serialize};
+use std::fs;
+use std::io::ErrorKind;
+use std::path::Path;
 
 /// Builds the microdragon kernel and packs it into an iso
 ///
@@ -21,32 +26,47 @@ pub struct IsoArguments {
 
 impl IsoArguments {
     pub fn run(self, mut ctx: CommandContext) -> Result<()> {
-        self.build.run()?;
+        if matches!(self.build.bootloader, Bootloader::Rust) {
+            return Err(anyhow!(
+                "Rust Bootloader does not support booting from disk."
+            ));
+        }
 
         println!("Collecting files...");
-        match self.build.bootloader {
-            Bootloader::Limine => limine::copy_files(&mut ctx, self.build.target)?,
-            Bootloader::Rust => {
-                return Err(anyhow!(
-                    "Rust Bootloader does not support booting from disk."
-                ))
-            }
-        }
+        self.build.run_alongside(|| match self.build.bootloader {
+            Bootloader::Limine => limine::copy_files(&mut ctx, self.build.target),
+            Bootloader::Rust => unreachable!(),
+        })?;
 
         build::copy_kernel_binary(&mut ctx, &self.build)?;
 
-        let tmp = ctx.shell().create_temp_dir()?;
-        ctx.file_system().write_to_path(tmp.path())?;
+        let root = ctx.target_directory().join("microdragon-iso");
+        ctx.file_system().write_to_path(&root)?;
+
+        let (xorriso, post_process) = match self.build.bootloader {
+            Bootloader::Limine => (limine::XORRISO_ARGUMENTS, limine::BIOS_INSTALL_ARGUMENTS),
+            Bootloader::Rust => unreachable!(),
+        };
 
-        println!("Creating iso...");
         let iso = ctx.target_directory().join("microdragon.iso");
+        let stamp_path = ctx.target_directory().join("microdragon-iso.json");
+        let stamp = IsoStamp {
+            version: ISO_STAMP_VERSION,
+            xorriso: xorriso.iter().map(|arg| arg.to_string()).collect(),
+            post_process: post_process.iter().map(|arg| arg.to_string()).collect(),
+            manifest: ctx.file_system().manifest(&root)?,
+        };
+        if iso.exists() && read_stamp(&stamp_path)?.as_ref() == Some(&stamp) {
+            println!("Iso is up to date.");
+            return Ok(());
+        }
+        ctx.shell().remove_path(&stamp_path)?;
+
+        println!("Creating iso...");
         ctx.shell()
             .cmd("xorriso")
-            .args(match self.build.bootloader {
-                Bootloader::Limine => limine::XORRISO_ARGUMENTS,
-                Bootloader::Rust => unreachable!(),
-            })
-            .arg(tmp.path())
+            .args(xorriso)
+            .arg(&root)
             .arg("-o")
             .arg(&iso)
             .run()?;
@@ -56,6 +76,33 @@ impl IsoArguments {
             Bootloader::Rust => unreachable!(),
         }
 
-        Ok(())
+        write_stamp(&stamp_path, &stamp)
     }
 }
+
+/// Bump when the iso is produced differently in a way the recorded arguments don't capture.
+const ISO_STAMP_VERSION: u32 = 1;
+
+/// Records how the last iso was produced, so unchanged builds can be skipped.
+#[derive(Serialize, Deserialize, PartialEq)]
+struct IsoStamp {
+    version: u32,
+    xorriso: Vec<String>,
+    post_process: Vec<String>,
+    manifest: Manifest,
+}
+
+fn read_stamp(path: &Path) -> Result<Option<IsoStamp>> {
+    match fs::read_to_string(path) {
+        Ok(text) => Ok(serde_json::from_str(&text).ok()),
+        Err(err) if err.kind() == ErrorKind::NotFound => Ok(None),
+        Err(err) => Err(err.into()),
+    }
+}
+
+fn write_stamp(path: &Path, stamp: &IsoStamp) -> Result<()> {
+    let tmp = path.with_extension("json.tmp");
+    fs::write(&tmp, serde_json::to_string(stamp)?)?;
+    fs::rename(tmp, path)?;
+    Ok(())
+}
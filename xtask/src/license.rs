@@ -6,7 +6,8 @@ use color_eyre::Result;
 use ignore::overrides::{Override, OverrideBuilder};
 use ignore::types::TypesBuilder;
 use ignore::{WalkBuilder, WalkState};
-use std::fs;
+use std::fs::{self, File};
+use std::io::{self, ErrorKind, Read};
 use std::path::Path;
 
 const LICENSE_DETECT_STRING: &str =
@@ -37,24 +38,27 @@ pub fn run(ctx: CommandContext) -> Result<()> {
                 return WalkState::Continue;
             }
 
-            let mut content = match fs::read_to_string(entry.path()) {
+            let path = entry.path();
+            let content = match has_license(path) {
+                Ok(true) => return WalkState::Continue,
+                Ok(false) => fs::read_to_string(path),
+                Err(err) => Err(err),
+            };
+            let content = match content {
                 Ok(content) => content,
                 Err(err) => {
-                    println!("Could not read {}: {err}", entry.path().display());
+                    println!("Could not read {}: {err}", path.display());
                     return WalkState::Continue;
                 }
             };
 
-            if !content.starts_with(LICENSE_DETECT_STRING) {
-                content.insert_str(0, LICENSE_TEXT);
+            let mut licensed = String::with_capacity(LICENSE_TEXT.len() + content.len());
+            licensed.push_str(LICENSE_TEXT);
+            licensed.push_str(&content);
 
-                match fs::write(entry.path(), content) {
-                    Ok(()) => println!("Updated: {}", entry.path().display()),
-                    Err(err) => {
-                        println!("Could not update {}: {err}", entry.path().display());
-                        return WalkState::Continue;
-                    }
-                }
+            match fs::write(path, licensed) {
+                Ok(()) => println!("Updated: {}", path.display()),
+                Err(err) => println!("Could not update {}: {err}", path.display()),
             }
 
             WalkState::Continue
@@ -64,6 +68,16 @@ pub fn run(ctx: CommandContext) -> Result<()> {
     Ok(())
 }
 
+/// Checks for the license header by only reading the first line's worth of bytes.
+fn has_license(path: &Path) -> io::Result<bool> {
+    let mut header = [0; LICENSE_DETECT_STRING.len()];
+    match File::open(path)?.read_exact(&mut header) {
+        Ok(()) => Ok(header == LICENSE_DETECT_STRING.as_bytes()),
+        Err(err) if err.kind() == ErrorKind::UnexpectedEof => Ok(false),
+        Err(err) => Err(err),
+    }
+}
+
 fn create_override(path: &Path) -> Result<Override> {
     Ok(OverrideBuilder::new(path)
         .add("!libs/")?
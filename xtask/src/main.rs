@@ -18,13 +18,10 @@ use utils::CommandContext;
 fn main() -> Result<()> {
     color_eyre::install()?;
 
-    let args = ProgramArguments::parse();
-    let ctx = CommandContext::new()?;
-
-    match args {
+    match ProgramArguments::parse() {
         ProgramArguments::Build(build) => build.run(),
-        ProgramArguments::Run(run) => run.run(ctx),
-        ProgramArguments::Iso(iso) => iso.run(ctx),
-        ProgramArguments::License => license::run(ctx),
+        ProgramArguments::Run(run) => run.run(CommandContext::new()?),
+        ProgramArguments::Iso(iso) => iso.run(CommandContext::new()?),
+        ProgramArguments::License => license::run(CommandContext::new()?),
     }
 }
@@ -24,10 +24,9 @@ pub struct RunArguments {
 
 impl RunArguments {
     pub fn run(self, mut ctx: CommandContext) -> Result<()> {
-        self.build.run()?;
-
         println!("Collecting files...");
-        self.copy_bootloader_files(&mut ctx)?;
+        self.build
+            .run_alongside(|| self.copy_bootloader_files(&mut ctx))?;
         build::copy_kernel_binary(&mut ctx, &self.build)?;
 
         println!("Generating FAT image...");